@@ -12,126 +12,193 @@ Usage:
 
 import sys
 import argparse
-from collections import defaultdict
+import io
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from array import array
+from functools import lru_cache
 
 
 # ── Frame tree with delta tracking ──────────────────────────────
 
-class DiffFrame:
-    __slots__ = ('name', 'count_a', 'count_b', 'self_a', 'self_b',
-                 'children', 'child_map')
-
-    def __init__(self, name):
-        self.name = name
-        self.count_a = 0  # "before" samples
-        self.count_b = 0  # "after" samples
-        self.self_a = 0
-        self.self_b = 0
-        self.children = []
-        self.child_map = {}
-
-    @property
-    def count(self):
-        return max(self.count_a, self.count_b)
-
-    @property
-    def delta(self):
-        return self.count_b - self.count_a
-
-    def add_child(self, name):
-        if name in self.child_map:
-            return self.child_map[name]
-        child = DiffFrame(name)
-        self.children.append(child)
-        self.child_map[name] = child
-        return child
+# Above this many children a node gets a dict for lookups
+SMALL_FANOUT = 8
+
 
-    def sort_children(self):
-        self.children.sort(key=lambda f: f.name)
-        for c in self.children:
-            c.sort_children()
+class DiffTree:
+    """Merged before/after frame tree stored as parallel arrays.
+
+    Node 0 is the root. Children form a linked list through
+    first_child/next_sibling, with a {name: child id} dict in wide for
+    nodes with more than SMALL_FANOUT children; finish() sorts every
+    sibling list by name once both profiles are in.
+    """
+    __slots__ = ('names', 'count_a', 'count_b', 'self_a', 'self_b', 'colors',
+                 'first_child', 'next_sibling', 'wide', 'max_depth')
+
+    def __init__(self):
+        self.names = ['root']
+        self.count_a = array('q', [0])  # "before" samples
+        self.count_b = array('q', [0])  # "after" samples
+        self.self_a = array('q', [0])
+        self.self_b = array('q', [0])
+        self.colors = array('B')  # index into DELTA_FILLS, set by color_diff_tree
+        self.first_child = array('i', [-1])   # -1 for leaves
+        self.next_sibling = array('i', [-1])  # -1 for the last child
+        self.wide = {}  # node -> {name: child id}, only for wide nodes
+        self.max_depth = 0  # deepest stack in either profile, set by the parser
+
+    def __len__(self):
+        return len(self.names)
+
+    def add_child(self, node, name):
+        """Return the id of node's child called name, creating it if needed."""
+        names = self.names
+        first_child = self.first_child
+        child_map = self.wide.get(node)
+        if child_map is not None:
+            child = child_map.get(name)
+            if child is not None:
+                return child
+        else:
+            # Most frames have only a handful of children: walking the
+            # sibling list beats keeping a dict for every node.
+            next_sibling = self.next_sibling
+            fanout = 0
+            child = first_child[node]
+            while child >= 0:
+                if names[child] == name:
+                    return child
+                child = next_sibling[child]
+                fanout += 1
+
+        child = len(names)
+        names.append(name)
+        self.count_a.append(0)
+        self.count_b.append(0)
+        self.self_a.append(0)
+        self.self_b.append(0)
+        first_child.append(-1)
+        self.next_sibling.append(first_child[node])
+        first_child[node] = child
+        if child_map is not None:
+            child_map[name] = child
+        elif fanout >= SMALL_FANOUT:
+            self.wide[node] = {names[c]: c for c in self.children(node)}
+        return child
 
-    def max_depth(self, depth=0):
-        m = depth
-        for c in self.children:
-            d = c.max_depth(depth + 1)
-            if d > m:
-                m = d
-        return m
+    def children(self, node):
+        """Yield the ids of node's children in list order."""
+        next_sibling = self.next_sibling
+        child = self.first_child[node]
+        while child >= 0:
+            yield child
+            child = next_sibling[child]
+
+    def finish(self):
+        """Sort every sibling list by name and drop the lookup dicts."""
+        by_name = self.names.__getitem__
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        for node in range(len(self.names)):
+            child = first_child[node]
+            if child < 0 or next_sibling[child] < 0:
+                continue
+            siblings = sorted(self.children(node), key=by_name, reverse=True)
+            prev = -1
+            for child in siblings:
+                next_sibling[child] = prev
+                prev = child
+            first_child[node] = prev
+        self.wide = {}
 
 
 # ── Parse folded stacks ────────────────────────────────────────
 
-def parse_folded(lines):
-    """Parse folded stack format, return dict of {stack_string: count}."""
-    stacks = defaultdict(int)
+def parse_folded_into(lines, tree, which):
+    """Merge folded stack bytes lines into a DiffTree.
+
+    which is 'a' (before) or 'b' (after) and selects the counters that are
+    incremented. Returns the number of samples read.
+    """
+    if which == 'a':
+        counts, self_counts = tree.count_a, tree.self_a
+    else:
+        counts, self_counts = tree.count_b, tree.self_b
+    add_child = tree.add_child
+    names = tree.names
+    first_child = tree.first_child
+    next_sibling = tree.next_sibling
+    wide = tree.wide
     total = 0
+    max_depth = tree.max_depth
     for line in lines:
         line = line.strip()
-        if not line or line.startswith('#'):
+        if not line or line.startswith(b'#'):
             continue
-        idx = line.rfind(' ')
+        idx = line.rfind(b' ')
         if idx < 0:
             continue
-        stack_str = line[:idx]
         try:
             count = int(line[idx + 1:])
         except ValueError:
             count = 1
         if count <= 0:
             count = 1
-        stacks[stack_str] += count
         total += count
-    return stacks, total
 
+        funcs = line[:idx].decode('utf-8', 'replace').split(';')
+        if len(funcs) > max_depth:
+            max_depth = len(funcs)
 
-def build_diff_tree(stacks_a, total_a, stacks_b, total_b):
-    """Build a merged differential frame tree from two stack profiles."""
-    root = DiffFrame("root")
-
-    # Normalize: convert counts to per-sample rates, then compare
-    # Or just use raw counts — we'll normalize when computing color
-
-    all_stacks = set(stacks_a.keys()) | set(stacks_b.keys())
-
-    for stack_str in all_stacks:
-        count_a = stacks_a.get(stack_str, 0)
-        count_b = stacks_b.get(stack_str, 0)
-
-        funcs = stack_str.split(';')
-        node = root
-        node.count_a += count_a
-        node.count_b += count_b
-
+        node = 0
+        counts[0] += count
         for func in funcs:
-            node = node.add_child(func)
-            node.count_a += count_a
-            node.count_b += count_b
-
-        node.self_a += count_a
-        node.self_b += count_b
-
-    return root
+            # Look existing children up inline; add_child (which rescans)
+            # only runs for wide nodes and for names not seen before.
+            if node in wide:
+                child = add_child(node, func)
+            else:
+                child = first_child[node]
+                while child >= 0 and names[child] != func:
+                    child = next_sibling[child]
+                if child < 0:
+                    child = add_child(node, func)
+            counts[child] += count
+            node = child
+        self_counts[node] += count
+
+    tree.max_depth = max_depth
+    return total
+
+
+def read_folded_into(path, tree, which):
+    """Merge a folded stack file into tree through an mmap instead of readlines()."""
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_folded_into(iter(mm.readline, b''), tree, which)
+
+
+def color_diff_tree(tree, total_a, total_b):
+    """Set each frame's delta colour from the merged before/after counts."""
+    # Colour every node once here so rendering is a table lookup
+    inv_a = 1.0 / total_a if total_a > 0 else 0.0
+    inv_b = 1.0 / total_b if total_b > 0 else 0.0
+    count_a = tree.count_a
+    count_b = tree.count_b
+    colors = array('B', [DELTA_NEUTRAL])
+    colors.extend(delta_index(count_b[i] * inv_b - count_a[i] * inv_a)
+                  for i in range(1, len(tree)))
+    tree.colors = colors
 
 
 # ── Color: red = regression, blue = improvement ────────────────
 
-def delta_color(count_a, count_b, total_a, total_b):
-    """
-    Compute color based on normalized delta.
-    Red = more samples in "after" (regression)
-    Blue = fewer samples in "after" (improvement)
-    Gray = unchanged
-    """
-    if total_a == 0 and total_b == 0:
-        return 200, 200, 200
-
-    # Normalize to rates
-    rate_a = count_a / total_a if total_a > 0 else 0
-    rate_b = count_b / total_b if total_b > 0 else 0
-
-    diff = rate_b - rate_a
-
+def diff_color(diff):
+    """Color for a difference in per-sample rates (after - before)."""
     if abs(diff) < 0.001:
         # Essentially unchanged — neutral gray
         return 200, 200, 200
@@ -154,8 +221,33 @@ def delta_color(count_a, count_b, total_a, total_b):
     return max(0, min(255, r)), max(0, min(255, g)), max(0, min(255, b))
 
 
+# Rate differences are quantized into DELTA_BUCKETS steps across
+# +/- DELTA_SPAN (where diff_color saturates); DELTA_FILLS holds the
+# pre-formatted fill for each step.
+DELTA_SPAN = 0.3
+DELTA_BUCKETS = 256
+DELTA_NEUTRAL = DELTA_BUCKETS // 2
+_DELTA_SCALE = DELTA_NEUTRAL / DELTA_SPAN
+
+DELTA_FILLS = [b'rgb(%d,%d,%d)' % diff_color((i - DELTA_NEUTRAL) / _DELTA_SCALE)
+               for i in range(DELTA_BUCKETS)]
+
+
+def delta_index(diff):
+    """Quantize a rate difference into an index into DELTA_FILLS."""
+    if abs(diff) < 0.001:
+        return DELTA_NEUTRAL
+    i = DELTA_NEUTRAL + int(diff * _DELTA_SCALE)
+    if i < 0:
+        return 0
+    if i >= DELTA_BUCKETS:
+        return DELTA_BUCKETS - 1
+    return i
+
+
 # ── XML escaping ───────────────────────────────────────────────
 
+@lru_cache(maxsize=None)
 def xml_escape(s):
     return (s.replace('&', '&amp;')
              .replace('<', '&lt;')
@@ -163,74 +255,198 @@ def xml_escape(s):
              .replace('"', '&quot;'))
 
 
+@lru_cache(maxsize=None)
+def xml_escape_bytes(s):
+    return xml_escape(s).encode()
+
+
 # ── SVG rendering ──────────────────────────────────────────────
 
 FRAME_HEIGHT = 16
 FONT_SIZE = 11
 MIN_WIDTH_PX = 0.1
-CHAR_WIDTH = 6.5
+CHAR_WIDTH = 7  # whole pixels, so label fitting stays in integer math
 MARGIN = 10
 
+RECT_HEIGHT = FRAME_HEIGHT - 1
+TEXT_BASELINE = FRAME_HEIGHT - 4
+
+# Per-frame templates. %-formatting with the constants baked in is
+# noticeably cheaper than several f-strings per frame on large graphs.
+# Templates are bytes: frames are formatted straight into the encoded
+# output instead of going through the text layer.
+_G_TMPL = b'<g id="d%d" class="fg">\n'  # d<node id>
+_REST_G_TMPL = b'<g id="d%d-rest" class="fg">\n'  # d<parent id>-rest
+_TITLE_TMPL = (b'<title>%s (before: %d [%.1f%%], after: %d [%.1f%%], '
+               b'delta: %s%.1f%%)</title>\n')
+_RECT_TMPL = (b'<rect x="%%.1f" y="%%.1f" width="%%.1f" height="%d" '
+              b'fill="%%s" rx="1" ry="1" class="frame" '
+              b'data-name="%%s" />\n' % RECT_HEIGHT)
+_TEXT_TMPL = (b'<text x="%%.1f" y="%%.1f" font-size="%d" font-family="monospace" '
+              b'fill="#000">%%s</text>\n' % FONT_SIZE)
+_TRUNC_TMPL = (b'<text x="%%.1f" y="%%.1f" font-size="%d" font-family="monospace" '
+               b'fill="#000">%%s..</text>\n' % FONT_SIZE)
+
+
+# Fragment buffer shared by every render_diff_frame call, so rendering
+# many graphs from one process does not allocate a new one each time.
+# Not safe for concurrent renders from several threads.
+_PARTS = []
+
+
+def _child_entries(tree, entry, inv_a, inv_b):
+    """Lay out the children of a stack entry, left to right.
+
+    Children narrower than MIN_WIDTH_PX are not returned; their samples
+    are folded into a single "(N frames)" entry at the end, whose node is
+    ~parent so it can be told apart from real nodes.
+    """
+    names = tree.names
+    counts_a = tree.count_a
+    counts_b = tree.count_b
+    colors = tree.colors
+    first_child = tree.first_child
+    next_sibling = tree.next_sibling
+
+    node, _, count_a, count_b, _, child, depth, x_left, x_width = entry
+    # Width based on max(count_a, count_b) for visibility
+    parent_count = max(count_a, count_b) or 1
+    scale = x_width * (1.0 / parent_count)
+    min_count = MIN_WIDTH_PX / scale
+    child_x = x_left
+    entries = []
+    other_a = other_b = other_frames = 0
+    while child >= 0:
+        child_a = counts_a[child]
+        child_b = counts_b[child]
+        child_count = child_a if child_a > child_b else child_b
+        if child_count < min_count:
+            other_a += child_a
+            other_b += child_b
+            other_frames += 1
+        else:
+            child_w = child_count * scale
+            entries.append((child, names[child], child_a, child_b, colors[child],
+                            first_child[child], depth + 1, child_x, child_w))
+            child_x += child_w
+        child = next_sibling[child]
+    if other_frames:
+        other = f"({other_frames} frame{'s' if other_frames > 1 else ''})"
+        entries.append((~node, other, other_a, other_b,
+                        delta_index(other_b * inv_b - other_a * inv_a), -1,
+                        depth + 1, child_x, max(other_a, other_b) * scale))
+    return entries
+
+
+def render_diff_frame(out, tree, entries, svg_height, total_a, total_b,
+                      descend=True):
+    """Render differential frames and, if descend, all of their descendants.
+
+    entries are stack entries as built by _child_entries, left to right.
+    Iterative pre-order walk; fragments are joined and written once
+    to out, which must be a binary stream.
+    """
+    parts = _PARTS
+    parts.clear()
+    append = parts.append
+    stack = entries[::-1]
+    inv_a = 1.0 / total_a if total_a > 0 else 0.0
+    inv_b = 1.0 / total_b if total_b > 0 else 0.0
+
+    while stack:
+        entry = stack.pop()
+        node, name, count_a, count_b, color, child, depth, x_left, x_width = entry
+        if x_width < MIN_WIDTH_PX:
+            continue
 
-def render_diff_frame(out, frame, depth, x_left, x_width, svg_height,
-                      total_a, total_b, max_count, fid_counter):
-    """Render a differential frame."""
-    if x_width < MIN_WIDTH_PX:
-        return fid_counter
+        y = svg_height - 30 - (depth + 1) * FRAME_HEIGHT
 
-    y = svg_height - 30 - (depth + 1) * FRAME_HEIGHT
+        fill = DELTA_FILLS[DELTA_NEUTRAL if depth == 0 else color]
 
-    if depth == 0:
-        r, g, b = 200, 200, 200
-    else:
-        r, g, b = delta_color(frame.count_a, frame.count_b, total_a, total_b)
-
-    escaped_name = xml_escape(frame.name)
-
-    rate_a = 100.0 * frame.count_a / total_a if total_a > 0 else 0
-    rate_b = 100.0 * frame.count_b / total_b if total_b > 0 else 0
-    diff_pct = rate_b - rate_a
-
-    fid = f"d{fid_counter}"
-    fid_counter += 1
-
-    sign = "+" if diff_pct >= 0 else ""
-
-    out.write(f'<g id="{fid}" class="fg">\n')
-    out.write(f'<title>{escaped_name} (before: {frame.count_a} [{rate_a:.1f}%], '
-              f'after: {frame.count_b} [{rate_b:.1f}%], '
-              f'delta: {sign}{diff_pct:.1f}%)</title>\n')
-    out.write(f'<rect x="{x_left:.1f}" y="{y:.1f}" width="{x_width:.1f}" '
-              f'height="{FRAME_HEIGHT - 1}" fill="rgb({r},{g},{b})" '
-              f'rx="1" ry="1" class="frame" '
-              f'data-name="{escaped_name}" />\n')
-
-    # Text label
-    text_width = len(frame.name) * CHAR_WIDTH
-    if x_width > text_width + 6:
-        out.write(f'<text x="{x_left + 3:.1f}" y="{y + FRAME_HEIGHT - 4:.1f}" '
-                  f'font-size="{FONT_SIZE}" font-family="monospace" fill="#000">'
-                  f'{escaped_name}</text>\n')
-    elif x_width > 20:
-        max_chars = int((x_width - 6) / CHAR_WIDTH)
-        if max_chars > 0:
-            trunc = xml_escape(frame.name[:max_chars])
-            out.write(f'<text x="{x_left + 3:.1f}" y="{y + FRAME_HEIGHT - 4:.1f}" '
-                      f'font-size="{FONT_SIZE}" font-family="monospace" fill="#000">'
-                      f'{trunc}..</text>\n')
-
-    out.write('</g>\n')
-
-    # Children — width based on max(count_a, count_b) for visibility
-    child_x = x_left
-    parent_count = frame.count if frame.count > 0 else 1
-    for child in frame.children:
-        child_w = x_width * (child.count / parent_count)
-        fid_counter = render_diff_frame(out, child, depth + 1, child_x, child_w,
-                                        svg_height, total_a, total_b, max_count, fid_counter)
-        child_x += child_w
+        escaped_name = xml_escape_bytes(name)
+
+        rate_a = 100.0 * count_a * inv_a
+        rate_b = 100.0 * count_b * inv_b
+        diff_pct = rate_b - rate_a
+
+        sign = b"+" if diff_pct >= 0 else b""
+
+        # Ids come from the tree rather than a running counter, so they
+        # do not depend on how rendering was split across processes.
+        append(_G_TMPL % node if node >= 0 else _REST_G_TMPL % ~node)
+        append(_TITLE_TMPL % (escaped_name, count_a, rate_a,
+                              count_b, rate_b, sign, diff_pct))
+        append(_RECT_TMPL % (x_left, y, x_width, fill, escaped_name))
+
+        # Text label
+        text_width = len(name) * CHAR_WIDTH
+        if x_width > text_width + 6:
+            append(_TEXT_TMPL % (x_left + 3, y + TEXT_BASELINE, escaped_name))
+        elif x_width > 20:
+            max_chars = int(x_width - 6) // CHAR_WIDTH
+            if max_chars > 0:
+                trunc = xml_escape_bytes(name[:max_chars])
+                append(_TRUNC_TMPL % (x_left + 3, y + TEXT_BASELINE, trunc))
+
+        append(b'</g>\n')
+
+        # Queue children; pushed in reverse so they pop left-to-right
+        if descend and child >= 0:
+            stack.extend(reversed(_child_entries(tree, entry, inv_a, inv_b)))
+
+    out.write(b''.join(parts))
+    parts.clear()
+
+
+# Below this many nodes a process pool costs more than it saves
+PARALLEL_MIN_NODES = 50000
+
+_worker_tree = None
 
-    return fid_counter
+
+def _init_worker(tree):
+    global _worker_tree
+    _worker_tree = tree
+
+
+def _render_subtree(args):
+    """Process pool task: render one subtree and return its SVG bytes."""
+    entry, svg_height, total_a, total_b = args
+    out = io.BytesIO()
+    render_diff_frame(out, _worker_tree, [entry], svg_height, total_a, total_b)
+    return out.getvalue()
+
+
+def render_diff_frames(out, tree, x_left, x_width, svg_height,
+                       total_a, total_b, jobs=1):
+    """Render every frame of tree, spreading subtrees over jobs processes.
+
+    The root and any chain of only children below it (typically main or
+    a thread entry point) are drawn here. The subtrees under the first
+    node with several children go to a process pool, and their fragments
+    are written back in order, so the output matches a serial render.
+    """
+    entry = (0, tree.names[0], tree.count_a[0], tree.count_b[0],
+             DELTA_NEUTRAL, tree.first_child[0], 0, x_left, x_width)
+    if jobs <= 1 or len(tree) < PARALLEL_MIN_NODES:
+        render_diff_frame(out, tree, [entry], svg_height, total_a, total_b)
+        return
+
+    inv_a = 1.0 / total_a if total_a > 0 else 0.0
+    inv_b = 1.0 / total_b if total_b > 0 else 0.0
+    head = [entry]
+    subtrees = _child_entries(tree, entry, inv_a, inv_b)
+    while len(subtrees) == 1:
+        head.append(subtrees[0])
+        subtrees = _child_entries(tree, subtrees[0], inv_a, inv_b)
+    render_diff_frame(out, tree, head, svg_height, total_a, total_b,
+                      descend=False)
+
+    tasks = [(e, svg_height, total_a, total_b) for e in subtrees]
+    with ProcessPoolExecutor(min(jobs, len(tasks)) or 1, initializer=_init_worker,
+                             initargs=(tree,)) as pool:
+        for part in pool.map(_render_subtree, tasks):
+            out.write(part)
 
 
 DIFF_JAVASCRIPT = """
@@ -278,51 +494,72 @@ DIFF_JAVASCRIPT = """
 """
 
 
-def render_diff_svg(out, root, total_a, total_b, title="Differential Flame Graph", width=1200):
-    """Render the differential SVG."""
-    root.sort_children()
-    depth = root.max_depth()
-    height = (depth + 2) * FRAME_HEIGHT + 100
+def render_diff_svg(out, tree, total_a, total_b, title="Differential Flame Graph",
+                    width=1200, jobs=1):
+    """Render the differential SVG.
 
-    max_count = max(root.count_a, root.count_b, 1)
+    out may be a text or binary stream. Output goes through a 1 MiB
+    BufferedWriter on the underlying binary stream as UTF-8 bytes; the
+    writer is detached afterwards so out stays open for the caller. A text
+    stream without a binary buffer (e.g. io.StringIO) gets the SVG decoded
+    in one write at the end.
+    jobs > 1 renders large graphs with a process pool.
+    """
+    depth = tree.max_depth
+    height = (depth + 2) * FRAME_HEIGHT + 100
 
-    out.write('<?xml version="1.0" standalone="no"?>\n')
-    out.write(f'<svg xmlns="http://www.w3.org/2000/svg" '
+    out.flush()  # anything already written through the text layer goes first
+    raw = getattr(out, 'buffer', out)
+    text_only = isinstance(raw, io.TextIOBase)
+    if text_only:
+        raw = io.BytesIO()
+    buf = io.BufferedWriter(raw, buffer_size=1 << 20)
+    write = buf.write
+
+    try:
+        write(b'<?xml version="1.0" standalone="no"?>\n')
+        write(f'<svg xmlns="http://www.w3.org/2000/svg" '
               f'width="{width}" height="{height}" '
-              f'viewBox="0 0 {width} {height}">\n')
+              f'viewBox="0 0 {width} {height}">\n'.encode())
 
-    out.write(f'<rect width="100%" height="100%" fill="#f8f8f8" />\n')
+        write(b'<rect width="100%" height="100%" fill="#f8f8f8" />\n')
 
-    # Title
-    out.write(f'<text x="{width // 2}" y="20" font-size="16" font-family="sans-serif" '
-              f'text-anchor="middle" fill="#333">{xml_escape(title)}</text>\n')
+        # Title
+        write(f'<text x="{width // 2}" y="20" font-size="16" font-family="sans-serif" '
+              f'text-anchor="middle" fill="#333">{xml_escape(title)}</text>\n'.encode())
 
-    # Subtitle
-    out.write(f'<text x="{width // 2}" y="36" font-size="11" font-family="sans-serif" '
+        # Subtitle
+        write(f'<text x="{width // 2}" y="36" font-size="11" font-family="sans-serif" '
               f'text-anchor="middle" fill="#888">Before: {total_a} samples, '
-              f'After: {total_b} samples. Ctrl+F to search.</text>\n')
-
-    # Legend
-    legend_y = 52
-    out.write(f'<rect x="{width // 2 - 160}" y="{legend_y - 10}" width="16" height="12" '
-              f'fill="rgb(100,120,255)" rx="2" />\n')
-    out.write(f'<text x="{width // 2 - 140}" y="{legend_y}" font-size="11" '
-              f'font-family="sans-serif" fill="#333">Improvement (less CPU)</text>\n')
-    out.write(f'<rect x="{width // 2 + 40}" y="{legend_y - 10}" width="16" height="12" '
-              f'fill="rgb(255,80,80)" rx="2" />\n')
-    out.write(f'<text x="{width // 2 + 60}" y="{legend_y}" font-size="11" '
-              f'font-family="sans-serif" fill="#333">Regression (more CPU)</text>\n')
-
-    # Details bar
-    out.write(f'<text id="details" x="4" y="{height - 6}" font-size="11" '
-              f'font-family="monospace" fill="#333"></text>\n')
-
-    # Render frames
-    render_diff_frame(out, root, 0, MARGIN, width - 2 * MARGIN, height,
-                      total_a, total_b, max_count, 0)
-
-    out.write(DIFF_JAVASCRIPT)
-    out.write('</svg>\n')
+              f'After: {total_b} samples. Ctrl+F to search.</text>\n'.encode())
+
+        # Legend
+        legend_y = 52
+        write(f'<rect x="{width // 2 - 160}" y="{legend_y - 10}" width="16" height="12" '
+              f'fill="rgb(100,120,255)" rx="2" />\n'.encode())
+        write(f'<text x="{width // 2 - 140}" y="{legend_y}" font-size="11" '
+              f'font-family="sans-serif" fill="#333">Improvement (less CPU)</text>\n'.encode())
+        write(f'<rect x="{width // 2 + 40}" y="{legend_y - 10}" width="16" height="12" '
+              f'fill="rgb(255,80,80)" rx="2" />\n'.encode())
+        write(f'<text x="{width // 2 + 60}" y="{legend_y}" font-size="11" '
+              f'font-family="sans-serif" fill="#333">Regression (more CPU)</text>\n'.encode())
+
+        # Details bar
+        write(f'<text id="details" x="4" y="{height - 6}" font-size="11" '
+              f'font-family="monospace" fill="#333"></text>\n'.encode())
+
+        # Render frames
+        render_diff_frames(buf, tree, MARGIN, width - 2 * MARGIN, height,
+                           total_a, total_b, jobs)
+
+        write(DIFF_JAVASCRIPT.encode())
+        write(b'</svg>\n')
+    finally:
+        # Detach even on error, or the writer's finalizer closes out
+        buf.flush()
+        buf.detach()
+    if text_only:
+        out.write(raw.getvalue().decode())
 
 
 # ── Main ────────────────────────────────────────────────────────
@@ -337,6 +574,8 @@ def main():
     parser.add_argument('-t', '--title', default='Differential Flame Graph',
                         help='Graph title')
     parser.add_argument('-w', '--width', type=int, default=1200, help='SVG width')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Processes used to render graphs with 50,000+ nodes (default: 1, serial)')
     args = parser.parse_args()
 
     # Resolve input files
@@ -352,10 +591,10 @@ def main():
     if not before_file or not after_file:
         parser.error("Need two input files: before.folded after.folded")
 
-    with open(before_file) as f:
-        stacks_a, total_a = parse_folded(f.readlines())
-    with open(after_file) as f:
-        stacks_b, total_b = parse_folded(f.readlines())
+    tree = DiffTree()
+    total_a = read_folded_into(before_file, tree, 'a')
+    total_b = read_folded_into(after_file, tree, 'b')
+    tree.finish()
 
     if total_a == 0:
         print(f"flamediff.py: no samples in {before_file}", file=sys.stderr)
@@ -366,13 +605,15 @@ def main():
 
     print(f"flamediff.py: before={total_a} samples, after={total_b} samples", file=sys.stderr)
 
-    root = build_diff_tree(stacks_a, total_a, stacks_b, total_b)
+    color_diff_tree(tree, total_a, total_b)
 
     if args.output:
         with open(args.output, 'w') as f:
-            render_diff_svg(f, root, total_a, total_b, args.title, args.width)
+            render_diff_svg(f, tree, total_a, total_b, args.title, args.width,
+                            args.jobs)
     else:
-        render_diff_svg(sys.stdout, root, total_a, total_b, args.title, args.width)
+        render_diff_svg(sys.stdout, tree, total_a, total_b, args.title, args.width,
+                        args.jobs)
 
     print("flamediff.py: done", file=sys.stderr)
 
@@ -13,61 +13,135 @@ Usage:
 
 import sys
 import argparse
-import hashlib
+import io
+import json
+import mmap
+import os
+import zlib
+from array import array
 from collections import defaultdict
+from functools import lru_cache
 
 
 # ── Frame tree ──────────────────────────────────────────────────
 
-class Frame:
-    __slots__ = ('name', 'count', 'self_count', 'children', 'child_map')
-
-    def __init__(self, name):
-        self.name = name
-        self.count = 0
-        self.self_count = 0
-        self.children = []
-        self.child_map = {}
-
-    def add_child(self, name):
-        if name in self.child_map:
-            return self.child_map[name]
-        child = Frame(name)
-        self.children.append(child)
-        self.child_map[name] = child
+# Above this many children a node gets a dict for lookups
+SMALL_FANOUT = 8
+
+
+class FrameTree:
+    """Frame tree stored as parallel arrays indexed by node id.
+
+    Node 0 is the root. Each node's children form a linked list through
+    first_child/next_sibling; nodes with more than SMALL_FANOUT children
+    also get a {name: child id} dict in wide. A node costs a few machine
+    words rather than an object with its own child list. finish() puts
+    every sibling list in name order once the tree is complete.
+    """
+    __slots__ = ('names', 'counts', 'self_counts', 'first_child',
+                 'next_sibling', 'wide', 'max_depth')
+
+    def __init__(self):
+        self.names = ['root']
+        self.counts = array('q', [0])
+        self.self_counts = array('q', [0])
+        self.first_child = array('i', [-1])   # -1 for leaves
+        self.next_sibling = array('i', [-1])  # -1 for the last child
+        self.wide = {}  # node -> {name: child id}, only for wide nodes
+        self.max_depth = 0  # deepest stack in the tree, set by the parser
+
+    def __len__(self):
+        return len(self.names)
+
+    def add_child(self, node, name):
+        """Return the id of node's child called name, creating it if needed."""
+        names = self.names
+        first_child = self.first_child
+        child_map = self.wide.get(node)
+        if child_map is not None:
+            child = child_map.get(name)
+            if child is not None:
+                return child
+        else:
+            # Most frames have only a handful of children: walking the
+            # sibling list beats keeping a dict for every node.
+            next_sibling = self.next_sibling
+            fanout = 0
+            child = first_child[node]
+            while child >= 0:
+                if names[child] == name:
+                    return child
+                child = next_sibling[child]
+                fanout += 1
+
+        child = len(names)
+        names.append(name)
+        self.counts.append(0)
+        self.self_counts.append(0)
+        first_child.append(-1)
+        self.next_sibling.append(first_child[node])
+        first_child[node] = child
+        if child_map is not None:
+            child_map[name] = child
+        elif fanout >= SMALL_FANOUT:
+            self.wide[node] = {names[c]: c for c in self.children(node)}
         return child
 
-    def sort_children(self):
-        self.children.sort(key=lambda f: f.name)
-        for c in self.children:
-            c.sort_children()
-
-    def max_depth(self, depth=0):
-        m = depth
-        for c in self.children:
-            d = c.max_depth(depth + 1)
-            if d > m:
-                m = d
-        return m
+    def children(self, node):
+        """Yield the ids of node's children in list order."""
+        next_sibling = self.next_sibling
+        child = self.first_child[node]
+        while child >= 0:
+            yield child
+            child = next_sibling[child]
+
+    def finish(self):
+        """Sort every sibling list by name and drop the lookup dicts."""
+        by_name = self.names.__getitem__
+        first_child = self.first_child
+        next_sibling = self.next_sibling
+        for node in range(len(self.names)):
+            child = first_child[node]
+            if child < 0 or next_sibling[child] < 0:
+                continue
+            siblings = sorted(self.children(node), key=by_name, reverse=True)
+            prev = -1
+            for child in siblings:
+                next_sibling[child] = prev
+                prev = child
+            first_child[node] = prev
+        self.wide = {}
 
 
 # ── Parse folded stacks ────────────────────────────────────────
 
 def parse_folded(lines):
-    root = Frame("root")
+    """Parse folded stacks from an iterable of bytes lines.
+
+    Lines are split in bytes and only the stack part is decoded, once per
+    line, so the input is never decoded or held in memory as a whole.
+    """
+    tree = FrameTree()
+    add_child = tree.add_child
+    names = tree.names
+    counts = tree.counts
+    self_counts = tree.self_counts
+    first_child = tree.first_child
+    next_sibling = tree.next_sibling
+    wide = tree.wide
     total = 0
+    max_depth = 0
 
     for line in lines:
         line = line.strip()
-        if not line or line.startswith('#'):
+        if not line or line.startswith(b'#'):
             continue
 
         # Format: func_a;func_b;func_c 42
-        idx = line.rfind(' ')
+        idx = line.rfind(b' ')
         if idx < 0:
             continue
 
-        stack_str = line[:idx]
         try:
             count = int(line[idx + 1:])
         except ValueError:
@@ -76,23 +150,59 @@ def parse_folded(lines):
             count = 1
 
         total += count
-        funcs = stack_str.split(';')
+        funcs = line[:idx].decode('utf-8', 'replace').split(';')
+        if len(funcs) > max_depth:
+            max_depth = len(funcs)
 
-        node = root
-        node.count += count
+        node = 0
+        counts[0] += count
         for func in funcs:
-            node = node.add_child(func)
-            node.count += count
-        node.self_count += count
-
-    return root, total
+            # Look existing children up inline; add_child (which rescans)
+            # only runs for wide nodes and for names not seen before.
+            if node in wide:
+                child = add_child(node, func)
+            else:
+                child = first_child[node]
+                while child >= 0 and names[child] != func:
+                    child = next_sibling[child]
+                if child < 0:
+                    child = add_child(node, func)
+            counts[child] += count
+            node = child
+        self_counts[node] += count
+
+    tree.max_depth = max_depth
+    tree.finish()
+    return tree, total
+
+
+def read_folded(path):
+    """Parse folded stacks from path, or stdin when path is None.
+
+    Files are mmapped and read line by line straight from the mapping.
+    Returns None when the input is empty.
+    """
+    if path is None:
+        stdin = sys.stdin.buffer
+        if not stdin.peek(1):
+            return None
+        return parse_folded(stdin)
+
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return parse_folded(iter(mm.readline, b''))
 
 
 # ── Color generation ───────────────────────────────────────────
 
+@lru_cache(maxsize=None)
 def name_to_color(name):
     """Warm color palette based on function name hash."""
-    h = int(hashlib.md5(name.encode()).hexdigest()[:8], 16)
+    # crc32 is only used for bit diffusion: deterministic and far cheaper
+    # than a cryptographic hash
+    h = zlib.crc32(name.encode('utf-8', 'replace')) & 0xFFFFFFFF
     hue = h % 60           # 0-60: red to yellow
     sat = 160 + (h >> 8) % 55
     val = 200 + (h >> 16) % 56
@@ -118,6 +228,7 @@ def name_to_color(name):
 
 # ── XML escaping ───────────────────────────────────────────────
 
+@lru_cache(maxsize=None)
 def xml_escape(s):
     return (s.replace('&', '&amp;')
              .replace('<', '&lt;')
@@ -125,126 +236,286 @@ def xml_escape(s):
              .replace('"', '&quot;'))
 
 
+@lru_cache(maxsize=None)
+def xml_escape_bytes(s):
+    return xml_escape(s).encode()
+
+
+def frame_data_script(name_ids, frame_table):
+    """Emit the name pool (N) and the flat frame table (F) as JS arrays.
+
+    F holds six numbers per frame: x, width, depth, name id, samples and
+    self samples. A "(N frames)" box has the name id -N instead, so it
+    never matches a name. The script uses it for hit-testing and tooltips.
+    Returns UTF-8 bytes, like the rest of the frame output.
+    """
+    names = list(name_ids)  # ids are handed out in insertion order
+    # '<' and '>' only occur inside JSON strings, so escaping them keeps
+    # the CDATA section and the surrounding markup intact.
+    pool = json.dumps(names).replace('<', '\\u003c').replace('>', '\\u003e')
+    return (b'<script type="text/javascript">\n<![CDATA[\nvar N = %s;\nvar F = [%s];\n]]>\n</script>\n'
+            % (pool.encode(), b','.join(frame_table)))
+
+
 # ── SVG rendering ──────────────────────────────────────────────
 
 FRAME_HEIGHT = 16
 FONT_SIZE = 11
 MIN_WIDTH_PX = 0.1
-CHAR_WIDTH = 6.5
+CHAR_WIDTH = 7  # whole pixels, so label fitting stays in integer math
 MARGIN = 10
 
+RECT_HEIGHT = FRAME_HEIGHT - 1
+TEXT_BASELINE = FRAME_HEIGHT - 4
+
+# Per-frame templates. %-formatting with the constants baked in is
+# noticeably cheaper than several f-strings per frame on large graphs.
+# Frames sharing a colour are drawn as subpaths of one <path>; per-frame
+# data lives in the script's frame table instead of in the markup.
+# Templates are bytes: frames are formatted straight into the encoded
+# output instead of going through the text layer.
+_SUBPATH_TMPL = b'M%%.1f %%.1fh%%.1fv%dh-%%.1fz' % RECT_HEIGHT
+_PATH_TMPL = b'<path fill="rgb(%d,%d,%d)" d="%s"/>\n'
+_ENTRY_TMPL = b'%.1f,%.1f,%d,%d,%d,%d'
+_TEXT_TMPL = b'<text x="%.1f" y="%.1f">%s</text>\n'
+_TRUNC_TMPL = b'<text x="%.1f" y="%.1f">%s..</text>\n'
+
+# Label buffer shared by every render_frame call, so rendering many graphs
+# from one process (e.g. a per-commit sweep) does not allocate a new one
+# each time. Not safe for concurrent renders from several threads.
+_PARTS = []
+
+# Shared styling for everything inside <g id="frames">
+SVG_STYLE = (
+    '<style type="text/css">\n'
+    '#frames path { cursor: pointer; }\n'
+    '#frames text { font-size: %dpx; font-family: monospace; fill: #000; '
+    'pointer-events: none; }\n'
+    '#hover { fill: none; stroke: #000; stroke-width: 0.5; pointer-events: none; }\n'
+    '#match { fill: rgb(230,0,230); pointer-events: none; }\n'
+    '</style>\n' % FONT_SIZE)
+
+
+def render_frame(out, tree, node, depth, x_left, x_width, svg_height,
+                 name_ids, frame_table):
+    """Render a frame and all of its descendants.
+
+    Walks the tree with an explicit stack (pre-order, so frames within a
+    row land in the table left to right). Frames are batched into one
+    <path> per fill colour, written before the text labels so the labels
+    sit on top. Each distinct name is interned into name_ids and every
+    drawn frame is appended to frame_table. out is a binary stream.
+    """
+    names = tree.names
+    counts = tree.counts
+    self_counts = tree.self_counts
+    first_child = tree.first_child
+    next_sibling = tree.next_sibling
+
+    # Globals used per frame, bound once as locals
+    color_of = name_to_color
+    escape = xml_escape_bytes
+    subpath_tmpl = _SUBPATH_TMPL
+    entry_tmpl = _ENTRY_TMPL
+    text_tmpl = _TEXT_TMPL
+    trunc_tmpl = _TRUNC_TMPL
+    min_width = MIN_WIDTH_PX
+    char_width = CHAR_WIDTH
+    row_height = FRAME_HEIGHT
+    text_baseline = TEXT_BASELINE
+    y_bottom = svg_height - 30 - FRAME_HEIGHT  # y of the depth 0 row
+    add_frame = frame_table.append
+    intern = name_ids.setdefault
+
+    paths = defaultdict(list)
+    labels = _PARTS
+    labels.clear()
+    append = labels.append
+    # Entries carry the frame's name and counts so the synthetic
+    # "(N frames)" boxes, which are not tree nodes, can share the walk.
+    # folded is N for those boxes and 0 for real frames.
+    stack = [(names[node], counts[node], self_counts[node], first_child[node],
+              depth, x_left, x_width, 0)]
+
+    while stack:
+        (name, count, self_count, child, depth, x_left, x_width,
+         folded) = stack.pop()
+        if x_width < min_width:
+            continue
 
-def render_frame(out, frame, depth, x_left, x_width, svg_height, total, frame_id_counter):
-    """Render a single frame and its children recursively."""
-    if x_width < MIN_WIDTH_PX:
-        return frame_id_counter
-
-    y = svg_height - 30 - (depth + 1) * FRAME_HEIGHT
-
-    if depth == 0:
-        r, g, b = 200, 200, 200
-    else:
-        r, g, b = name_to_color(frame.name)
-
-    pct = 100.0 * frame.count / total if total > 0 else 0
-    self_pct = 100.0 * frame.self_count / total if total > 0 else 0
-    escaped_name = xml_escape(frame.name)
-
-    fid = f"f{frame_id_counter}"
-    frame_id_counter += 1
-
-    # Group with title for tooltip
-    out.write(f'<g id="{fid}" class="fg">\n')
-    out.write(f'<title>{escaped_name} ({frame.count} samples, {pct:.1f}%'
-              f'{f", self: {self_pct:.1f}%" if frame.self_count > 0 else ""})</title>\n')
-    out.write(f'<rect x="{x_left:.1f}" y="{y:.1f}" width="{x_width:.1f}" '
-              f'height="{FRAME_HEIGHT - 1}" fill="rgb({r},{g},{b})" '
-              f'rx="1" ry="1" class="frame" '
-              f'data-name="{escaped_name}" />\n')
-
-    # Text label
-    text_width = len(frame.name) * CHAR_WIDTH
-    if x_width > text_width + 6:
-        out.write(f'<text x="{x_left + 3:.1f}" y="{y + FRAME_HEIGHT - 4:.1f}" '
-                  f'font-size="{FONT_SIZE}" font-family="monospace" fill="#000">'
-                  f'{escaped_name}</text>\n')
-    elif x_width > 20:
-        max_chars = int((x_width - 6) / CHAR_WIDTH)
-        if max_chars > 0:
-            trunc = xml_escape(frame.name[:max_chars])
-            out.write(f'<text x="{x_left + 3:.1f}" y="{y + FRAME_HEIGHT - 4:.1f}" '
-                      f'font-size="{FONT_SIZE}" font-family="monospace" fill="#000">'
-                      f'{trunc}..</text>\n')
-
-    out.write('</g>\n')
-
-    # Render children
-    child_x = x_left
-    for child in frame.children:
-        child_w = x_width * (child.count / frame.count) if frame.count > 0 else 0
-        frame_id_counter = render_frame(out, child, depth + 1, child_x, child_w,
-                                        svg_height, total, frame_id_counter)
-        child_x += child_w
-
-    return frame_id_counter
+        y = y_bottom - depth * row_height
+
+        escaped_name = escape(name)
+        if folded:
+            # Neutral fill and a negative id: the box stands for unrelated
+            # frames, so it is kept out of the name pool, focus and search
+            color = (200, 200, 200)
+            name_id = -folded
+        else:
+            color = (200, 200, 200) if depth == 0 else color_of(name)
+            name_id = intern(name, len(name_ids))
+
+        paths[color].append(subpath_tmpl % (x_left, y, x_width, x_width))
+        add_frame(entry_tmpl % (x_left, x_width, depth, name_id,
+                                count, self_count))
+
+        # Text label
+        text_width = len(name) * char_width
+        if x_width > text_width + 6:
+            append(text_tmpl % (x_left + 3, y + text_baseline, escaped_name))
+        elif x_width > 20:
+            max_chars = int(x_width - 6) // char_width
+            if max_chars > 0:
+                trunc = escape(name[:max_chars])
+                append(trunc_tmpl % (x_left + 3, y + text_baseline, trunc))
+
+        # Queue children; pushed in reverse so they pop left-to-right
+        if child < 0 or count <= 0:
+            continue
+        scale = x_width * (1.0 / count)
+        # Children narrower than MIN_WIDTH_PX are not walked at all; their
+        # samples are folded into a single "(N frames)" box at the end.
+        min_count = min_width / scale
+        child_x = x_left
+        queued = []
+        other_count = other_frames = 0
+        while child >= 0:
+            child_count = counts[child]
+            if child_count < min_count:
+                other_count += child_count
+                other_frames += 1
+            else:
+                child_w = child_count * scale
+                queued.append((names[child], child_count, self_counts[child],
+                               first_child[child], depth + 1, child_x, child_w,
+                               0))
+                child_x += child_w
+            child = next_sibling[child]
+        if other_frames:
+            other = f"({other_frames} frame{'s' if other_frames > 1 else ''})"
+            queued.append((other, other_count, 0, -1, depth + 1, child_x,
+                           other_count * scale, other_frames))
+        queued.reverse()
+        stack.extend(queued)
+
+    out.write(b''.join([_PATH_TMPL % (r, g, b, b''.join(d))
+                        for (r, g, b), d in paths.items()]))
+    out.write(b''.join(labels))
+    labels.clear()
 
 
 SVG_JAVASCRIPT = """
 <script type="text/javascript">
 <![CDATA[
 (function() {
-    var frames = document.querySelectorAll('.frame');
+    var svg = document.documentElement;
+    var framesEl = document.getElementById('frames');
+    var total = +framesEl.getAttribute('data-total');
+    var bottom = +framesEl.getAttribute('data-bottom');
+    var rowHeight = +framesEl.getAttribute('data-row');
+    var hover = document.getElementById('hover');
+    var match = document.getElementById('match');
     var details = document.getElementById('details');
+    var tip = document.getElementById('tip');
     var searchMatch = document.getElementById('search-match');
     var zoomStack = [];
 
-    // Hover effects
-    frames.forEach(function(f) {
-        f.style.cursor = 'pointer';
-        f.addEventListener('mouseover', function() {
-            f.style.stroke = '#000';
-            f.style.strokeWidth = '0.5';
-            var t = f.parentNode.querySelector('title');
-            if (t && details) details.textContent = t.textContent;
-        });
-        f.addEventListener('mouseout', function() {
-            f.style.stroke = 'none';
+    // Index the frame table by depth. Pre-order emission means each row
+    // is already sorted by x, so lookups can binary search.
+    var rows = [];
+    for (var i = 0; i < F.length; i += 6) {
+        var d = F[i + 2];
+        (rows[d] = rows[d] || []).push(i);
+    }
+
+    function rowY(depth) {
+        return bottom - (depth + 1) * rowHeight;
+    }
+
+    function frameAt(e) {
+        var pt = svg.createSVGPoint();
+        pt.x = e.clientX;
+        pt.y = e.clientY;
+        pt = pt.matrixTransform(svg.getScreenCTM().inverse());
+        var row = rows[Math.floor((bottom - pt.y) / rowHeight)];
+        if (!row) return -1;
+        var lo = 0, hi = row.length - 1;
+        while (lo <= hi) {
+            var mid = (lo + hi) >> 1, j = row[mid];
+            if (pt.x < F[j]) hi = mid - 1;
+            else if (pt.x >= F[j] + F[j + 1]) lo = mid + 1;
+            else return j;
+        }
+        return -1;
+    }
+
+    // Frames folded into one "(N frames)" box carry the name id -N
+    function frameName(j) {
+        var id = F[j + 3];
+        return id >= 0 ? N[id] : '(' + -id + (id < -1 ? ' frames)' : ' frame)');
+    }
+
+    function describe(j) {
+        var c = F[j + 4], s = F[j + 5];
+        var text = frameName(j) + ' (' + c + ' samples, ' +
+                   (total > 0 ? 100 * c / total : 0).toFixed(1) + '%';
+        if (s > 0) text += ', self: ' + (total > 0 ? 100 * s / total : 0).toFixed(1) + '%';
+        return text + ')';
+    }
+
+    // Fill every frame accepted by pred with the highlight colour
+    function highlight(pred) {
+        var d = [], matched = 0;
+        for (var j = 0; j < F.length; j += 6) {
+            if (!pred(j)) continue;
+            d.push('M' + F[j] + ' ' + rowY(F[j + 2]) + 'h' + F[j + 1] +
+                   'v' + (rowHeight - 1) + 'h' + (-F[j + 1]) + 'z');
+            matched++;
+        }
+        match.setAttribute('d', d.join(''));
+        return matched;
+    }
+
+    // Hover: one handler hit-tests the pointer against the frame table
+    framesEl.addEventListener('mousemove', function(e) {
+        var j = frameAt(e);
+        if (j < 0) {
+            hover.setAttribute('display', 'none');
             if (details) details.textContent = '';
-        });
-
-        // Click to zoom
-        f.addEventListener('click', function() {
-            var name = f.getAttribute('data-name');
-            if (!name) return;
-            zoomToFrame(name);
-        });
+            tip.textContent = '';
+            return;
+        }
+        var text = describe(j);
+        hover.setAttribute('x', F[j]);
+        hover.setAttribute('y', rowY(F[j + 2]));
+        hover.setAttribute('width', F[j + 1]);
+        hover.setAttribute('display', 'inline');
+        if (details) details.textContent = text;
+        if (tip.textContent !== text) tip.textContent = text;
+    });
+    framesEl.addEventListener('mouseout', function() {
+        hover.setAttribute('display', 'none');
+        if (details) details.textContent = '';
+        tip.textContent = '';
+    });
+
+    // Click to zoom
+    framesEl.addEventListener('click', function(e) {
+        var j = frameAt(e);
+        if (j < 0 || F[j + 3] < 0) return;
+        zoomToFrame(F[j + 3]);
     });
 
-    function zoomToFrame(name) {
-        // Highlight matching frames
-        var matched = 0, total = 0;
-        frames.forEach(function(f) {
-            total++;
-            var n = f.getAttribute('data-name');
-            if (n === name) {
-                f.style.opacity = '1';
-                f.style.stroke = '#000';
-                f.style.strokeWidth = '1';
-                matched++;
-            } else {
-                f.style.opacity = '0.4';
-                f.style.stroke = 'none';
-            }
-        });
+    function zoomToFrame(id) {
+        // Highlight matching frames (same name id)
+        var name = N[id];
+        var matched = highlight(function(j) { return F[j + 3] === id; });
         if (searchMatch) searchMatch.textContent = 'Focused: ' + name + ' (' + matched + ' frames)';
         zoomStack.push(name);
     }
 
     function resetView() {
-        frames.forEach(function(f) {
-            f.style.opacity = '1';
-            f.style.stroke = 'none';
-        });
+        match.setAttribute('d', '');
         if (searchMatch) searchMatch.textContent = '';
         zoomStack = [];
     }
@@ -257,15 +528,8 @@ SVG_JAVASCRIPT = """
             var term = prompt('Search function name:');
             if (!term) { resetView(); return; }
             term = term.toLowerCase();
-            var matched = 0;
-            frames.forEach(function(f) {
-                var t = f.parentNode.querySelector('title');
-                if (t && t.textContent.toLowerCase().indexOf(term) >= 0) {
-                    f.style.opacity = '1';
-                    matched++;
-                } else {
-                    f.style.opacity = '0.3';
-                }
+            var matched = highlight(function(j) {
+                return F[j + 3] >= 0 && N[F[j + 3]].toLowerCase().indexOf(term) >= 0;
             });
             if (searchMatch) searchMatch.textContent = 'Search: "' + term + '" (' + matched + ' matches)';
         }
@@ -287,48 +551,86 @@ SVG_JAVASCRIPT = """
 """
 
 
-def render_svg(out, root, total, title="Flame Graph", width=1200):
-    """Render the complete SVG flame graph."""
-    root.sort_children()
-    depth = root.max_depth()
+def render_svg(out, tree, total, title="Flame Graph", width=1200):
+    """Render the complete SVG flame graph.
+
+    out may be a text or binary stream. Output goes through a 1 MiB
+    BufferedWriter on the underlying binary stream as UTF-8 bytes; the
+    writer is detached afterwards so out stays open for the caller. A text
+    stream without a binary buffer (e.g. io.StringIO) gets the SVG decoded
+    in one write at the end.
+    """
+    depth = tree.max_depth
     height = (depth + 2) * FRAME_HEIGHT + 80
 
-    out.write('<?xml version="1.0" standalone="no"?>\n')
-    out.write(f'<svg xmlns="http://www.w3.org/2000/svg" '
+    out.flush()  # anything already written through the text layer goes first
+    raw = getattr(out, 'buffer', out)
+    text_only = isinstance(raw, io.TextIOBase)
+    if text_only:
+        raw = io.BytesIO()
+    buf = io.BufferedWriter(raw, buffer_size=1 << 20)
+    write = buf.write
+
+    try:
+        write(b'<?xml version="1.0" standalone="no"?>\n')
+        write(f'<svg xmlns="http://www.w3.org/2000/svg" '
               f'width="{width}" height="{height}" '
-              f'viewBox="0 0 {width} {height}">\n')
+              f'viewBox="0 0 {width} {height}">\n'.encode())
 
-    # Background
-    out.write(f'<rect width="100%" height="100%" fill="#f8f8f8" />\n')
+        # Background
+        write(b'<rect width="100%" height="100%" fill="#f8f8f8" />\n')
 
-    # Title
-    out.write(f'<text x="{width // 2}" y="20" font-size="16" font-family="sans-serif" '
-              f'text-anchor="middle" fill="#333">{xml_escape(title)}</text>\n')
+        # Title
+        write(f'<text x="{width // 2}" y="20" font-size="16" font-family="sans-serif" '
+              f'text-anchor="middle" fill="#333">{xml_escape(title)}</text>\n'.encode())
 
-    # Subtitle
-    out.write(f'<text x="{width // 2}" y="36" font-size="11" font-family="sans-serif" '
+        # Subtitle
+        write(f'<text x="{width // 2}" y="36" font-size="11" font-family="sans-serif" '
               f'text-anchor="middle" fill="#888">{total} samples. '
-              f'Click to focus, Ctrl+F to search, Esc to reset.</text>\n')
-
-    # Reset button
-    out.write(f'<text id="reset-btn" x="{width - 60}" y="20" font-size="11" '
-              f'font-family="sans-serif" fill="#4477cc">[Reset]</text>\n')
-
-    # Search match indicator
-    out.write(f'<text id="search-match" x="4" y="{height - 22}" font-size="11" '
-              f'font-family="monospace" fill="#cc4444"></text>\n')
-
-    # Details bar
-    out.write(f'<text id="details" x="4" y="{height - 6}" font-size="11" '
-              f'font-family="monospace" fill="#333"></text>\n')
-
-    # Render all frames
-    render_frame(out, root, 0, MARGIN, width - 2 * MARGIN, height, total, 0)
-
-    # JavaScript
-    out.write(SVG_JAVASCRIPT)
-
-    out.write('</svg>\n')
+              f'Click to focus, Ctrl+F to search, Esc to reset.</text>\n'.encode())
+
+        # Reset button
+        write(f'<text id="reset-btn" x="{width - 60}" y="20" font-size="11" '
+              f'font-family="sans-serif" fill="#4477cc">[Reset]</text>\n'.encode())
+
+        # Search match indicator
+        write(f'<text id="search-match" x="4" y="{height - 22}" font-size="11" '
+              f'font-family="monospace" fill="#cc4444"></text>\n'.encode())
+
+        # Details bar
+        write(f'<text id="details" x="4" y="{height - 6}" font-size="11" '
+              f'font-family="monospace" fill="#333"></text>\n'.encode())
+
+        # Render all frames
+        write(SVG_STYLE.encode())
+        write(f'<g id="frames" data-total="{total}" data-bottom="{height - 30}" '
+              f'data-row="{FRAME_HEIGHT}">\n'.encode())
+        # One shared tooltip; the hover handler fills it for the frame under
+        # the pointer instead of every frame carrying its own <title>
+        write(b'<title id="tip"></title>\n')
+        name_ids = {}
+        frame_table = []
+        render_frame(buf, tree, 0, 0, MARGIN, width - 2 * MARGIN, height,
+                     name_ids, frame_table)
+        write(b'</g>\n')
+
+        # Search/focus highlight and hover outline, driven by the script
+        write(b'<path id="match" d="" />\n')
+        write(b'<rect id="hover" height="%d" display="none" />\n' % RECT_HEIGHT)
+
+        # Name pool and frame table used for hit-testing and tooltips
+        write(frame_data_script(name_ids, frame_table))
+
+        # JavaScript
+        write(SVG_JAVASCRIPT.encode())
+
+        write(b'</svg>\n')
+    finally:
+        # Detach even on error, or the writer's finalizer closes out
+        buf.flush()
+        buf.detach()
+    if text_only:
+        out.write(raw.getvalue().decode())
 
 
 # ── Main ────────────────────────────────────────────────────────
@@ -344,18 +646,12 @@ def main():
                         help='Color palette (default: warm)')
     args = parser.parse_args()
 
-    # Read input
-    if args.input:
-        with open(args.input) as f:
-            lines = f.readlines()
-    else:
-        lines = sys.stdin.readlines()
-
-    if not lines:
+    parsed = read_folded(args.input)
+    if parsed is None:
         print("flamegraph.py: no input", file=sys.stderr)
         sys.exit(1)
 
-    root, total = parse_folded(lines)
+    tree, total = parsed
 
     if total == 0:
         print("flamegraph.py: no samples found in input", file=sys.stderr)
@@ -366,9 +662,9 @@ def main():
     # Write output
     if args.output:
         with open(args.output, 'w') as f:
-            render_svg(f, root, total, args.title, args.width)
+            render_svg(f, tree, total, args.title, args.width)
     else:
-        render_svg(sys.stdout, root, total, args.title, args.width)
+        render_svg(sys.stdout, tree, total, args.title, args.width)
 
     print("flamegraph.py: done", file=sys.stderr)
 
@@ -19,32 +19,39 @@ def main():
                         help="Don't display the plot, just save")
     args = parser.parse_args()
 
-    # Parse CSV
-    data = {}  # mode -> {threads: ops_per_sec}
-    with open(args.csv_file) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            mode = row["mode"]
-            threads = int(row["threads"])
-            ops = float(row["ops_per_sec"])
-            if mode not in data:
-                data[mode] = {}
-            data[mode][threads] = ops
-
-    if not data:
-        print("No data found in CSV", file=sys.stderr)
-        sys.exit(1)
-
     try:
         import matplotlib
         if args.no_display:
             matplotlib.use("Agg")
         import matplotlib.pyplot as plt
+        import numpy as np
     except ImportError:
+        data = read_csv_dict(args.csv_file)
+        if not data:
+            print("No data found in CSV", file=sys.stderr)
+            sys.exit(1)
         print("matplotlib not installed. Printing text table instead.\n")
         print_text_chart(data)
         return
 
+    # Parse CSV once into typed columns; per-mode series are boolean masks
+    arr = np.atleast_1d(np.genfromtxt(args.csv_file, delimiter=",", names=True,
+                                      dtype=None, encoding="utf-8"))
+    if arr.size == 0:
+        print("No data found in CSV", file=sys.stderr)
+        sys.exit(1)
+    modes = arr["mode"]
+    threads_col = arr["threads"]
+    ops_col = arr["ops_per_sec"].astype(float)
+
+    def series(mode):
+        """Return (threads, ops) for one mode, sorted by thread count."""
+        mask = modes == mode
+        t = threads_col[mask]
+        o = ops_col[mask]
+        order = np.argsort(t)
+        return t[order], o[order]
+
     # Plot
     fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 6))
 
@@ -53,14 +60,12 @@ def main():
     labels = {"padded": "Padded (no false sharing)",
               "packed": "Packed (false sharing)",
               "true_share": "True sharing (atomic)"}
+    present = [m for m in ["padded", "packed", "true_share"] if (modes == m).any()]
 
     # Left plot: absolute throughput
-    for mode in ["padded", "packed", "true_share"]:
-        if mode not in data:
-            continue
-        threads = sorted(data[mode].keys())
-        ops = [data[mode][t] for t in threads]
-        ax1.plot(threads, [o / 1e9 for o in ops],
+    for mode in present:
+        threads, ops = series(mode)
+        ax1.plot(threads, ops / 1e9,
                  color=colors.get(mode, "gray"),
                  marker=markers.get(mode, "o"),
                  linewidth=2, markersize=8,
@@ -71,29 +76,22 @@ def main():
     ax1.set_title("Absolute Throughput", fontsize=14)
     ax1.legend(fontsize=10)
     ax1.grid(True, alpha=0.3)
-    ax1.set_xticks(sorted(list(data.get("padded", data.get("packed", {})).keys())))
+    tick_mode = "padded" if (modes == "padded").any() else "packed"
+    ax1.set_xticks(np.unique(threads_col[modes == tick_mode]))
 
     # Right plot: normalized to single-thread performance
-    for mode in ["padded", "packed", "true_share"]:
-        if mode not in data:
-            continue
-        threads = sorted(data[mode].keys())
-        ops = [data[mode][t] for t in threads]
-        if threads and threads[0] == 1 and ops[0] > 0:
-            baseline = ops[0]
-        else:
-            baseline = ops[0] if ops else 1
-        normalized = [o / baseline for o in ops]
-        ax2.plot(threads, normalized,
+    for mode in present:
+        threads, ops = series(mode)
+        ax2.plot(threads, ops / ops[0],
                  color=colors.get(mode, "gray"),
                  marker=markers.get(mode, "o"),
                  linewidth=2, markersize=8,
                  label=labels.get(mode, mode))
 
     # Ideal scaling line
-    all_threads = sorted(set(t for m in data.values() for t in m.keys()))
-    if all_threads:
-        ax2.plot(all_threads, [t / all_threads[0] for t in all_threads],
+    all_threads = np.unique(threads_col)
+    if all_threads.size:
+        ax2.plot(all_threads, all_threads / all_threads[0],
                  color="gray", linestyle="--", alpha=0.5, label="Ideal linear")
 
     ax2.set_xlabel("Thread Count", fontsize=12)
@@ -107,7 +105,9 @@ def main():
     plt.tight_layout()
 
     output = args.output or "results/scaling.png"
-    plt.savefig(output, dpi=150, bbox_inches="tight")
+    # zlib level 1 for PNG output; the SVG/PDF backends reject pil_kwargs
+    png = {"pil_kwargs": {"compress_level": 1}} if output.lower().endswith(".png") else {}
+    plt.savefig(output, dpi=150, bbox_inches="tight", **png)
     print(f"Plot saved to {output}")
 
     if not args.no_display:
@@ -117,6 +117,21 @@ def main():
             pass
 
 
+def read_csv_dict(path):
+    """Parse scaling.csv into {mode: {threads: ops_per_sec}} (text fallback)."""
+    data = {}
+    with open(path) as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            mode = row["mode"]
+            threads = int(row["threads"])
+            ops = float(row["ops_per_sec"])
+            if mode not in data:
+                data[mode] = {}
+            data[mode][threads] = ops
+    return data
+
+
 def print_text_chart(data):
     """Fallback text-based display when matplotlib is unavailable."""
     print(f"{'Threads':<10}", end="")
@@ -13,29 +13,43 @@ Falls back to a text-mode table if matplotlib is unavailable.
 import argparse
 import csv
 import sys
+import warnings
+
+# (label, linewidth, linestyle, alpha) for the p50/p95/p99/max columns
+SERIES = (
+    ("p50", 1.5, "-", 1.0),
+    ("p95", 1.5, "-", 1.0),
+    ("p99", 1.5, "--", 1.0),
+    ("max", 1.0, ":", 0.7),
+)
 
 
 def load_csv(path):
-    rows = []
-    with open(path) as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            rows.append({
-                "ts": float(r["timestamp"]),
-                "p50": int(r["p50_us"]),
-                "p95": int(r["p95_us"]),
-                "p99": int(r["p99_us"]),
-                "max": int(r["max_us"]),
-            })
-    return rows
+    """Load runqlat CSV as rows of (timestamp, p50, p95, p99, max).
+
+    With numpy this is one (N, 5) float array parsed in C, so columns can be
+    sliced directly; without it, a list of tuples for the text table.
+    """
+    try:
+        import numpy as np
+    except ImportError:
+        with open(path) as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return [(float(r[0]), int(r[1]), int(r[2]), int(r[3]), int(r[4]))
+                    for r in reader if r]
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # loadtxt warns on a header-only file
+        return np.loadtxt(path, delimiter=",", skiprows=1, ndmin=2)
 
 
 def text_table(rows):
     """Fallback: print a simple ASCII table."""
     print(f"{'#':>4}  {'p50 (us)':>10}  {'p95 (us)':>10}  {'p99 (us)':>10}  {'max (us)':>10}")
     print("-" * 52)
-    for i, r in enumerate(rows):
-        print(f"{i:4d}  {r['p50']:10d}  {r['p95']:10d}  {r['p99']:10d}  {r['max']:10d}")
+    for i, (_, p50, p95, p99, max_us) in enumerate(rows):
+        print(f"{i:4d}  {int(p50):10d}  {int(p95):10d}  {int(p99):10d}  {int(max_us):10d}")
 
 
 def plot_matplotlib(rows, output):
@@ -43,15 +57,21 @@ def plot_matplotlib(rows, output):
     matplotlib.use("Agg")
     import matplotlib.pyplot as plt
 
-    t0 = rows[0]["ts"]
-    xs = [r["ts"] - t0 for r in rows]
+    ts = rows[:, 0]
+    xs = ts - ts[0]
 
+    # One ax.plot call over the (N, 4) percentile columns creates all four
+    # lines with a single autoscale; styles are applied afterwards
     fig, ax = plt.subplots(figsize=(10, 5))
-    ax.plot(xs, [r["p50"] for r in rows], label="p50", linewidth=1.5)
-    ax.plot(xs, [r["p95"] for r in rows], label="p95", linewidth=1.5)
-    ax.plot(xs, [r["p99"] for r in rows], label="p99", linewidth=1.5, linestyle="--")
-    ax.plot(xs, [r["max"] for r in rows], label="max", linewidth=1.0,
-            linestyle=":", alpha=0.7)
+    lines = ax.plot(xs, rows[:, 1:5])
+    for line, (label, width, style, alpha) in zip(lines, SERIES):
+        line.set_label(label)
+        line.set_linewidth(width)
+        line.set_linestyle(style)
+        line.set_alpha(alpha)
+    # The max series is the noisiest; rasterized, -o latency.svg/.pdf does
+    # not embed every spike as a vector path. PNG output is unaffected
+    lines[-1].set_rasterized(True)
 
     ax.set_xlabel("Time (seconds)")
     ax.set_ylabel("Run-queue latency (us)")
@@ -62,7 +82,9 @@ def plot_matplotlib(rows, output):
 
     plt.tight_layout()
     if output:
-        plt.savefig(output, dpi=150)
+        # Fast zlib level for PNGs; other formats take no pil_kwargs
+        png = {"pil_kwargs": {"compress_level": 1}} if output.lower().endswith(".png") else {}
+        plt.savefig(output, dpi=150, **png)
         print(f"Saved: {output}", file=sys.stderr)
     else:
         plt.show()
@@ -75,7 +97,7 @@ def main():
     args = parser.parse_args()
 
     rows = load_csv(args.csv_file)
-    if not rows:
+    if len(rows) == 0:
         print("No data in CSV file.", file=sys.stderr)
         return 1
 
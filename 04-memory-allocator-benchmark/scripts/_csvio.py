@@ -0,0 +1,86 @@
+"""
+_csvio.py — CSV loading shared by the plot_*.py scripts.
+
+Columns come back as {name: ndarray}. pyarrow's C++ parser is used when it
+is installed; otherwise each script passes its own pure-Python/numpy
+fallback parser. Parsed files are cached as <csv>.npz next to the CSV.
+"""
+import os
+import zipfile
+
+import numpy as np
+
+try:
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa_csv = None  # optional fast CSV backend
+
+
+def _skip_row(row):
+    return "skip"
+
+
+def read_columns(path, fallback):
+    """Read a CSV into {column: ndarray}, or {} if it has no rows.
+
+    Uses pyarrow's multithreaded parser when it is installed, and
+    fallback(path) otherwise.
+    """
+    if os.path.getsize(path) == 0:
+        return {}
+    if pa_csv is None:
+        return fallback(path)
+    # Rows with the wrong number of cells (e.g. a benchmark killed mid-write)
+    # are dropped rather than failing the whole file
+    options = pa_csv.ParseOptions(invalid_row_handler=_skip_row)
+    table = pa_csv.read_csv(path, parse_options=options)
+    if table.num_rows == 0:
+        return {}
+    columns = {}
+    for name, column in zip(table.column_names, table.columns):
+        values = column.to_numpy(zero_copy_only=False)
+        columns[name] = values.astype(str) if values.dtype == object else values
+    return columns
+
+
+def cached_read(path, fallback):
+    """read_columns through an NPZ cache kept next to the CSV.
+
+    The cache is used while it is at least as new as the CSV, so repeated
+    plot runs over unchanged results skip parsing; any problem reading or
+    writing it just falls back to parsing the CSV.
+    """
+    cache = path + ".npz"
+    try:
+        if os.path.getmtime(cache) >= os.path.getmtime(path):
+            with np.load(cache) as npz:
+                return {name: npz[name] for name in npz.files}
+    except (OSError, ValueError, zipfile.BadZipFile):
+        pass
+    columns = read_columns(path, fallback)
+    if columns:
+        tmp = cache + ".tmp"
+        try:
+            with open(tmp, "wb") as f:
+                np.savez(f, **columns)
+            os.replace(tmp, cache)
+        except OSError:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+    return columns
+
+
+def as_float(column):
+    """Return a column as a float array, with NaN where a cell does not parse."""
+    try:
+        return np.asarray(column, dtype=float)
+    except (ValueError, TypeError):
+        out = np.full(len(column), np.nan)
+        for i, v in enumerate(column):
+            try:
+                out[i] = float(v)
+            except (ValueError, TypeError):
+                pass
+        return out
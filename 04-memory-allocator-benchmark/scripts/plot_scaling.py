@@ -8,20 +8,26 @@ Writes: results/scaling_<workload>.png  (one per workload)
 import sys
 import os
 import csv
-from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import zip_longest
 
 try:
     import matplotlib
     matplotlib.use("Agg")
     import matplotlib.pyplot as plt
+    from matplotlib.figure import SubplotParams
     import numpy as np
 except ImportError:
     print("ERROR: matplotlib and numpy required. Install: pip install matplotlib numpy",
           file=sys.stderr)
     sys.exit(1)
 
+from _csvio import as_float, cached_read
+
 RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results")
 
+PNG_OPTIONS = {"compress_level": 1}  # fast zlib level, identical pixels
+
 COLORS = {
     "glibc":    "#4e79a7",
     "jemalloc": "#f28e2b",
@@ -30,6 +36,8 @@ COLORS = {
     "unknown":  "#999999",
 }
 
+FIGSIZE = (10, 6)
+
 MARKERS = {
     "glibc":    "o",
     "jemalloc": "s",
@@ -39,63 +47,106 @@ MARKERS = {
 }
 
 
+def _csv_read(path):
+    """Read a CSV into {column: ndarray of str} with the csv module (no pyarrow)."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = [r for r in reader if r]
+    if not rows:
+        return {}
+    # Short rows are padded with "", which as_float reads as NaN, so a
+    # truncated last line drops out in plot_scaling's masks
+    return {name: np.array(c, dtype=str)
+            for name, c in zip(header, zip_longest(*rows, fillvalue=""))}
+
+
 def read_csv(path):
     if not os.path.exists(path):
         print(f"File not found: {path}", file=sys.stderr)
-        return []
-    with open(path, newline="") as f:
-        return list(csv.DictReader(f))
-
-
-def plot_scaling(data, workload, output_path):
-    """Plot throughput vs threads for a given workload, one line per allocator."""
-    # Group by allocator
-    by_alloc = defaultdict(list)
-    for row in data:
-        if row["workload"] != workload:
-            continue
-        try:
-            threads = int(row["threads"])
-            ops = float(row["ops_per_sec"])
-            by_alloc[row["allocator"]].append((threads, ops))
-        except (ValueError, KeyError):
-            continue
-
-    if not by_alloc:
-        print(f"No data for workload '{workload}'", file=sys.stderr)
-        return
+        return {}
+    return cached_read(path, _csv_read)
+
 
-    fig, ax = plt.subplots(figsize=(10, 6))
+def plot_scaling(data, workload, output_path, ax=None):
+    """Plot throughput vs threads for a given workload, one line per allocator.
 
-    for alloc in sorted(by_alloc.keys()):
-        points = sorted(by_alloc[alloc])
-        threads = [p[0] for p in points]
-        ops = [p[1] for p in points]
+    With ax, the chart is drawn into that Axes after clearing it, so one
+    figure can be reused for every workload; otherwise a new one is made.
+    """
+    # Boolean masks over the parsed columns replace the per-row grouping
+    threads = as_float(data["threads"])
+    ops = as_float(data["ops_per_sec"])
+    in_workload = (np.asarray(data["workload"]) == workload) & ~np.isnan(threads)
+    valid = in_workload & ~np.isnan(ops)
+    allocators = np.asarray(data["allocator"])
 
-        ax.plot(threads, ops,
+    if not valid.any():
+        print(f"No data for workload '{workload}'", file=sys.stderr)
+        return
+
+    if ax is None:
+        fig, ax = plt.subplots(figsize=FIGSIZE)
+        owns_fig = True
+    else:
+        ax.clear()
+        fig = ax.figure
+        # Start tight_layout from the default margins, not the last chart's
+        fig.subplots_adjust(**vars(SubplotParams()))
+        owns_fig = False
+
+    # Sort the workload's rows once by thread count, ties by throughput (as
+    # sorted() on tuples did); each allocator's selection keeps that order
+    rows = np.flatnonzero(valid)
+    rows = rows[np.lexsort((ops[rows], threads[rows]))]
+    row_allocs = allocators[rows]
+
+    plotted = np.unique(row_allocs)
+    for alloc in plotted:
+        sel = rows[row_allocs == alloc]
+        ax.plot(threads[sel], ops[sel],
                 marker=MARKERS.get(alloc, "x"),
                 color=COLORS.get(alloc, "#999"),
                 label=alloc, linewidth=2, markersize=8)
 
     ax.set_xlabel("Thread Count")
     ax.set_ylabel("Operations / sec")
-    ax.set_title(f"Multithreaded Scalability: {workload}")
-    ax.legend()
+    title = f"Multithreaded Scalability: {workload}"
+    # A lone allocator is named in the title rather than in a legend
+    if len(plotted) > 1:
+        ax.set_title(title)
+        ax.legend()
+    else:
+        ax.set_title(f"{title} ({plotted[0]})")
     ax.grid(alpha=0.3)
     ax.set_xscale("log", base=2)
 
     # Set x ticks to actual thread counts
-    all_threads = sorted(set(
-        int(r["threads"]) for r in data
-        if r["workload"] == workload
-    ))
+    all_threads = np.unique(threads[in_workload]).astype(int)
     ax.set_xticks(all_threads)
     ax.set_xticklabels([str(t) for t in all_threads])
 
     fig.tight_layout()
-    fig.savefig(output_path, dpi=150)
+    fig.savefig(output_path, dpi=150, pil_kwargs=PNG_OPTIONS)
     print(f"  Saved: {output_path}")
-    plt.close(fig)
+    if owns_fig:
+        plt.close(fig)
+
+
+_worker_data = None
+_worker_ax = None
+
+
+def _init_worker(data):
+    global _worker_data, _worker_ax
+    _worker_data = data
+    _, _worker_ax = plt.subplots(figsize=FIGSIZE)
+
+
+def _render_one(args):
+    """Process pool task: render the scaling chart for one workload."""
+    workload, output_path = args
+    plot_scaling(_worker_data, workload, output_path, ax=_worker_ax)
 
 
 def main():
@@ -105,10 +156,19 @@ def main():
         print("No data found. Run: ./scripts/run_all.sh first.", file=sys.stderr)
         sys.exit(1)
 
-    workloads = sorted(set(row["workload"] for row in data))
-    for w in workloads:
-        out = os.path.join(RESULTS_DIR, f"scaling_{w}.png")
-        plot_scaling(data, w, out)
+    workloads = sorted(set(data["workload"]))
+    tasks = [(w, os.path.join(RESULTS_DIR, f"scaling_{w}.png")) for w in workloads]
+    # Each PNG is an independent Agg render, so spread them over processes
+    jobs = min(os.cpu_count() or 1, len(tasks))
+    if jobs <= 1:
+        fig, ax = plt.subplots(figsize=FIGSIZE)
+        for w, out in tasks:
+            plot_scaling(data, w, out, ax=ax)
+        plt.close(fig)
+        return
+    with ProcessPoolExecutor(jobs, initializer=_init_worker,
+                             initargs=(data,)) as pool:
+        list(pool.map(_render_one, tasks))
 
 
 if __name__ == "__main__":
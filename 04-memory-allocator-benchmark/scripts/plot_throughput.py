@@ -10,7 +10,7 @@ Writes: results/throughput_micro.png
 import sys
 import os
 import csv
-from collections import defaultdict
+from itertools import zip_longest
 
 try:
     import matplotlib
@@ -22,8 +22,12 @@ except ImportError:
           file=sys.stderr)
     sys.exit(1)
 
+from _csvio import as_float, cached_read
+
 RESULTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results")
 
+PNG_OPTIONS = {"compress_level": 1}  # cheaper PNG encode than the default level 6
+
 COLORS = {
     "glibc":    "#4e79a7",
     "jemalloc": "#f28e2b",
@@ -33,35 +37,56 @@ COLORS = {
 }
 
 
+def _csv_read(path):
+    """Read a CSV into {column: ndarray of str} with the csv module (no pyarrow)."""
+    with open(path, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = [r for r in reader if r]
+    if not rows:
+        return {}
+    # Short rows are padded with "", which as_float reads as NaN
+    return {name: np.array(c, dtype=str)
+            for name, c in zip(header, zip_longest(*rows, fillvalue=""))}
+
+
 def read_csv(path):
-    """Read CSV file, return list of dicts."""
+    """Read CSV file, return {column: ndarray of values}."""
     if not os.path.exists(path):
         print(f"File not found: {path}", file=sys.stderr)
-        return []
-    with open(path, newline="") as f:
-        return list(csv.DictReader(f))
+        return {}
+    return cached_read(path, _csv_read)
 
 
 def plot_grouped_bars(data, output_path, title, value_key="ops_per_sec", ylabel="Operations / sec"):
     """
-    data: list of dicts with keys: allocator, workload, <value_key>
+    data: {column: values} with columns: allocator, workload, <value_key>
     Groups by workload, bars by allocator.
     """
-    # Aggregate: mean per (allocator, workload)
-    agg = defaultdict(list)
-    for row in data:
-        key = (row["allocator"], row["workload"])
-        try:
-            agg[key].append(float(row[value_key]))
-        except (ValueError, KeyError):
-            continue
-
-    if not agg:
+    # Aggregate: mean and std per (allocator, workload) in one vectorised
+    # pass; cells are numbered allocator-major and summed with bincount
+    values = as_float(data.get(value_key, ()))
+    ok = ~np.isnan(values)
+    if not ok.any():
         print(f"No data to plot for {output_path}", file=sys.stderr)
         return
 
-    workloads = sorted(set(k[1] for k in agg.keys()))
-    allocators = sorted(set(k[0] for k in agg.keys()))
+    allocators, alloc_idx = np.unique(np.asarray(data["allocator"])[ok],
+                                      return_inverse=True)
+    workloads, work_idx = np.unique(np.asarray(data["workload"])[ok],
+                                    return_inverse=True)
+    values = values[ok]
+    shape = (len(allocators), len(workloads))
+    cell = alloc_idx * len(workloads) + work_idx
+    counts = np.bincount(cell, minlength=shape[0] * shape[1])
+    sums = np.bincount(cell, weights=values, minlength=counts.size)
+    means = np.divide(sums, counts, out=np.zeros(counts.size), where=counts > 0)
+    dev = values - means[cell]
+    sq_dev = np.bincount(cell, weights=dev * dev, minlength=counts.size)
+    stds = np.sqrt(np.divide(sq_dev, counts, out=np.zeros(counts.size),
+                             where=counts > 1))
+    means = means.reshape(shape)
+    stds = stds.reshape(shape)
 
     x = np.arange(len(workloads))
     width = 0.8 / len(allocators)
@@ -69,34 +94,31 @@ def plot_grouped_bars(data, output_path, title, value_key="ops_per_sec", ylabel=
     fig, ax = plt.subplots(figsize=(max(10, len(workloads) * 2), 6))
 
     for i, alloc in enumerate(allocators):
-        means = []
-        stds = []
-        for w in workloads:
-            vals = agg.get((alloc, w), [])
-            means.append(np.mean(vals) if vals else 0)
-            stds.append(np.std(vals) if len(vals) > 1 else 0)
-
         offset = (i - len(allocators) / 2 + 0.5) * width
-        bars = ax.bar(x + offset, means, width, yerr=stds,
+        bars = ax.bar(x + offset, means[i], width,
                       label=alloc, color=COLORS.get(alloc, "#999"),
-                      capsize=3, edgecolor="white", linewidth=0.5)
+                      edgecolor="white", linewidth=0.5)
+        # Error bars are drawn separately so bar_label anchors the labels
+        # to the bar tops rather than to the error bar tips
+        ax.errorbar(x + offset, means[i], yerr=stds[i], fmt="none",
+                    ecolor="k", capsize=3)
 
-        # Value labels
-        for bar, mean in zip(bars, means):
-            if mean > 0:
-                label = f"{mean:.0f}" if mean < 1e6 else f"{mean/1e6:.1f}M"
-                ax.text(bar.get_x() + bar.get_width() / 2, bar.get_height(),
-                        label, ha="center", va="bottom", fontsize=7, rotation=45)
+        # Value labels, one bar_label call per allocator; empty bars get ""
+        labels = ["" if m <= 0 else f"{m:.0f}" if m < 1e6 else f"{m/1e6:.1f}M"
+                  for m in means[i]]
+        ax.bar_label(bars, labels=labels, padding=2, fontsize=7, rotation=45)
 
     ax.set_xlabel("Workload")
     ax.set_ylabel(ylabel)
-    ax.set_title(title)
+    ax.set_title(title if len(allocators) > 1 else f"{title} ({allocators[0]})")
     ax.set_xticks(x)
     ax.set_xticklabels(workloads, rotation=30, ha="right")
-    ax.legend()
+    # A lone allocator is named in the title rather than in a legend
+    if len(allocators) > 1:
+        ax.legend()
     ax.grid(axis="y", alpha=0.3)
     fig.tight_layout()
-    fig.savefig(output_path, dpi=150)
+    fig.savefig(output_path, dpi=150, pil_kwargs=PNG_OPTIONS)
     print(f"  Saved: {output_path}")
     plt.close(fig)
 